@@ -1,67 +1,158 @@
 from fastapi import FastAPI, Request, UploadFile, File, HTTPException
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, ORJSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 import psycopg2
-from psycopg2.extras import RealDictCursor
-import json
+from psycopg2.extras import execute_values
+import io
+import itertools
 import os
+import queue
+import sqlite3
+import threading
+from contextlib import ExitStack, contextmanager
 from datetime import datetime
 from typing import List, Optional
+import ijson
+import orjson
 import uvicorn
 
-app = FastAPI(title="VR Session Data Server", version="1.0.0")
+app = FastAPI(
+    title="VR Session Data Server",
+    version="1.0.0",
+    default_response_class=ORJSONResponse
+)
 
 # Database configuration
-def get_db_connection():
-    """Get database connection based on environment"""
+LOCAL_POSTGRES = {
+    "host": "localhost",
+    "database": "emotional_tracking",
+    "user": "postgres",
+    "password": "password"
+}
+
+def detect_sqlite():
+    """Decide once per process whether to use SQLite or PostgreSQL"""
     if os.getenv('VERCEL'):
+        # Vercel Postgres
+        return False
+    if os.getenv('USE_SQLITE'):
+        # Local SQLite for quick testing
+        return True
+    # Local PostgreSQL (default for development)
+    try:
+        psycopg2.connect(**LOCAL_POSTGRES).close()
+        return False
+    except psycopg2.OperationalError:
+        # Fallback to SQLite if PostgreSQL is not available
+        print("PostgreSQL not available, falling back to SQLite")
+        return True
+
+DB_IS_SQLITE = detect_sqlite()
+
+# Upper bound on simultaneously open database connections
+DB_POOL_MAX = 10
+# Connections kept open between requests; new ones are only opened on demand
+DB_POOL_IDLE = 5
+# Seconds a request waits for a free connection before giving up with 503
+DB_POOL_TIMEOUT = 10
+
+class ConnectionPool:
+    """Keep recently used connections open between requests, newest first"""
+    
+    def __init__(self, maxidle, connect, is_alive=None):
+        self.connect = connect
+        self.is_alive = is_alive
+        self.idle = queue.LifoQueue(maxidle)
+    
+    def getconn(self):
+        while True:
+            try:
+                conn = self.idle.get_nowait()
+            except queue.Empty:
+                # Nothing idle left to check, so this one is known to be fresh
+                return self.connect()
+            if self.is_alive is None or self.is_alive(conn):
+                return conn
+            conn.close()
+    
+    def putconn(self, conn):
+        # Never hand out a connection with a half-finished transaction
+        try:
+            conn.rollback()
+            self.idle.put_nowait(conn)
+        except (queue.Full, sqlite3.Error, psycopg2.Error):
+            conn.close()
+
+def connect_sqlite():
+    """Open a SQLite connection tuned for this app's upload-heavy workload"""
+    conn = sqlite3.connect("session_data.db", check_same_thread=False)
+    # WAL keeps readers unblocked during uploads; NORMAL skips the fsync per commit
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    # Keep temp tables in RAM and read the database through a 256 MiB memory map
+    conn.execute('PRAGMA temp_store=MEMORY')
+    conn.execute('PRAGMA mmap_size=268435456')
+    return conn
+
+def postgres_is_alive(conn):
+    """Ping an idle PostgreSQL connection the server may have dropped"""
+    # Closed by an idle timeout or server restart
+    try:
+        cursor = conn.cursor()
+        cursor.execute('SELECT 1')
+        cursor.close()
+        return True
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        return False
+
+def create_db_pool():
+    """Create the connection pool for the configured database"""
+    if DB_IS_SQLITE:
+        return ConnectionPool(DB_POOL_IDLE, connect_sqlite)
+    elif os.getenv('VERCEL'):
         # Vercel Postgres
         POSTGRES_URL = os.getenv('POSTGRES_URL')
         if not POSTGRES_URL:
             raise Exception("POSTGRES_URL environment variable not set")
-        try:
-            conn = psycopg2.connect(POSTGRES_URL)
-            # Test the connection
-            cursor = conn.cursor()
-            cursor.execute('SELECT 1')
-            cursor.fetchone()
-            cursor.close()
-            return conn
-        except Exception as e:
-            raise Exception(f"Failed to connect to Vercel Postgres: {type(e).__name__}: {str(e)}")
-    elif os.getenv('USE_SQLITE'):
-        # Local SQLite for quick testing
-        import sqlite3
-        return sqlite3.connect("session_data.db")
+        
+        def connect_vercel():
+            try:
+                return psycopg2.connect(POSTGRES_URL)
+            except Exception as e:
+                raise Exception(f"Failed to connect to Vercel Postgres: {type(e).__name__}: {str(e)}")
+        return ConnectionPool(DB_POOL_IDLE, connect_vercel, postgres_is_alive)
     else:
-        # Local PostgreSQL (default for development)
+        return ConnectionPool(DB_POOL_IDLE, lambda: psycopg2.connect(**LOCAL_POSTGRES), postgres_is_alive)
+
+db_pool = create_db_pool()
+# The pool opens connections on demand, so cap how many can be out at once
+db_pool_slots = threading.BoundedSemaphore(DB_POOL_MAX)
+
+@contextmanager
+def db_connection():
+    """Borrow a pooled database connection for the duration of a with block"""
+    if not db_pool_slots.acquire(timeout=DB_POOL_TIMEOUT):
+        raise HTTPException(status_code=503, detail="Database busy, please retry")
+    try:
+        conn = db_pool.getconn()
         try:
-            return psycopg2.connect(
-                host="localhost",
-                database="emotional_tracking",
-                user="postgres",
-                password="password"
-            )
-        except psycopg2.OperationalError:
-            # Fallback to SQLite if PostgreSQL is not available
-            print("PostgreSQL not available, falling back to SQLite")
-            import sqlite3
-            return sqlite3.connect("session_data.db")
+            yield conn
+        finally:
+            db_pool.putconn(conn)
+    finally:
+        db_pool_slots.release()
 
 def init_db():
     """Initialize the database with required tables"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Check if we're using SQLite or PostgreSQL
-    is_sqlite = hasattr(conn, 'execute') and 'sqlite' in str(type(conn)).lower()
-    
-    if is_sqlite:
-        # SQLite syntax
-        cursor.execute('''
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        
+        # Only the auto-increment id column differs between SQLite and PostgreSQL
+        id_column = 'id INTEGER PRIMARY KEY AUTOINCREMENT' if DB_IS_SQLITE else 'id SERIAL PRIMARY KEY'
+        cursor.execute(f'''
             CREATE TABLE IF NOT EXISTS session_records (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                {id_column},
                 session_id TEXT NOT NULL,
                 phase TEXT,
                 area TEXT,
@@ -91,46 +182,253 @@ def init_db():
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         ''')
-    else:
-        # PostgreSQL syntax
+        
+        # One row per session so session counts don't need COUNT(DISTINCT) scans
         cursor.execute('''
-            CREATE TABLE IF NOT EXISTS session_records (
-                id SERIAL PRIMARY KEY,
-                session_id TEXT NOT NULL,
-                phase TEXT,
-                area TEXT,
-                timestamp TEXT,
-                speaker TEXT,
-                text TEXT,
-                hmd_position_x REAL,
-                hmd_position_y REAL,
-                hmd_position_z REAL,
-                hmd_gaze_x REAL,
-                hmd_gaze_y REAL,
-                hmd_gaze_z REAL,
-                hmd_gaze_actor TEXT,
-                hmd_movement_speed REAL,
-                controller_r_x REAL,
-                controller_r_y REAL,
-                controller_r_z REAL,
-                controller_l_x REAL,
-                controller_l_y REAL,
-                controller_l_z REAL,
-                controller_r_actor TEXT,
-                controller_l_actor TEXT,
-                controller_r_speed REAL,
-                controller_l_speed REAL,
-                user_emotion TEXT,
-                emotion_window_flag BOOLEAN,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                first_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         ''')
-    
-    conn.commit()
-    conn.close()
+        
+        # Per-session lookups, the 24h stats window and newest-first session paging
+        cursor.execute('CREATE INDEX IF NOT EXISTS ix_session_records_session_ts ON session_records (session_id, timestamp)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS ix_session_records_created ON session_records (created_at)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS ix_sessions_first_seen ON sessions (first_seen)')
+        
+        # Backfill sessions uploaded before the table existed; ids inserted meanwhile
+        # by a concurrent init or upload are skipped rather than failing the insert
+        cursor.execute('SELECT 1 FROM sessions LIMIT 1')
+        if cursor.fetchone() is None:
+            if DB_IS_SQLITE:
+                cursor.execute('''
+                    INSERT OR IGNORE INTO sessions (session_id, first_seen)
+                    SELECT session_id, MIN(created_at) FROM session_records GROUP BY session_id
+                ''')
+            else:
+                cursor.execute('''
+                    INSERT INTO sessions (session_id, first_seen)
+                    SELECT session_id, MIN(created_at) FROM session_records GROUP BY session_id
+                    ON CONFLICT (session_id) DO NOTHING
+                ''')
+        
+        conn.commit()
+
+# Initialize database on startup; set RUN_DB_INIT=0 once the schema exists
+if os.getenv('RUN_DB_INIT', '1') == '1':
+    init_db()
+
+# Uploaded records are parsed and inserted in batches of this size
+UPLOAD_BATCH_SIZE = 1000
+
+# Batches larger than this are loaded with COPY instead of batched INSERTs
+COPY_THRESHOLD = 200
+
+# Uploaded data columns of session_records, in the order flatten_record produces them
+RECORD_COLUMNS = (
+    'session_id', 'phase', 'area', 'timestamp', 'speaker', 'text',
+    'hmd_position_x', 'hmd_position_y', 'hmd_position_z',
+    'hmd_gaze_x', 'hmd_gaze_y', 'hmd_gaze_z', 'hmd_gaze_actor', 'hmd_movement_speed',
+    'controller_r_x', 'controller_r_y', 'controller_r_z',
+    'controller_l_x', 'controller_l_y', 'controller_l_z',
+    'controller_r_actor', 'controller_l_actor',
+    'controller_r_speed', 'controller_l_speed',
+    'user_emotion', 'emotion_window_flag'
+)
+RECORD_SELECT = ', '.join(RECORD_COLUMNS)
+
+# Bind parameter marker for the configured driver's paramstyle
+PLACEHOLDER = '?' if DB_IS_SQLITE else '%s'
+
+INSERT_SQL = (
+    f"INSERT INTO session_records ({RECORD_SELECT}) "
+    f"VALUES ({', '.join([PLACEHOLDER] * len(RECORD_COLUMNS))})"
+)
+# psycopg2.extras.execute_values expands the single %s into pages of row tuples
+BATCH_INSERT_SQL = f"INSERT INTO session_records ({RECORD_SELECT}) VALUES %s"
+COPY_SQL = f"COPY session_records ({RECORD_SELECT}) FROM STDIN WITH (FORMAT CSV)"
+
+# Full row as returned by /api/sessions/{session_id}
+SESSION_RECORD_COLUMNS = ('id',) + RECORD_COLUMNS + ('created_at',)
+SESSION_RECORD_SELECT = ', '.join(SESSION_RECORD_COLUMNS)
+
+# Shared stand-in for missing sub-objects; never mutated
+_EMPTY = {}
+
+def flatten_record(record):
+    """Flatten a nested session record into a session_records row tuple"""
+    conversation = record.get('conversation_data') or _EMPTY
+    hmd = record.get('hmd_data') or _EMPTY
+    hmd_position = hmd.get('position') or _EMPTY
+    gaze = hmd.get('gaze_vector') or _EMPTY
+    controller = record.get('controller_data') or _EMPTY
+    r_position = controller.get('r_position') or _EMPTY
+    l_position = controller.get('l_position') or _EMPTY
+    return (
+        record.get('session_id'),
+        record.get('phase'),
+        record.get('area'),
+        record.get('timestamp'),
+        conversation.get('speaker'),
+        conversation.get('text'),
+        hmd_position.get('x'),
+        hmd_position.get('y'),
+        hmd_position.get('z'),
+        gaze.get('x'),
+        gaze.get('y'),
+        gaze.get('z'),
+        hmd.get('gaze_actor'),
+        hmd.get('movement_speed'),
+        r_position.get('x'),
+        r_position.get('y'),
+        r_position.get('z'),
+        l_position.get('x'),
+        l_position.get('y'),
+        l_position.get('z'),
+        controller.get('r_interacted_actor'),
+        controller.get('l_interacted_actor'),
+        controller.get('r_movement_speed'),
+        controller.get('l_movement_speed'),
+        record.get('user_emotion'),
+        record.get('emotion_window_flag')
+    )
+
+def csv_field(value):
+    """Encode one value for COPY CSV; only NULL is written as an unquoted empty field"""
+    if value is None:
+        return ''
+    # Match what execute_values stores for the same row on smaller uploads
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (int, float)):
+        return str(value)
+    if isinstance(value, (dict, list)):
+        raise psycopg2.ProgrammingError(f"can't adapt type '{type(value).__name__}'")
+    # Quoted fields are never read as NULL, whatever they contain
+    return '"' + str(value).replace('"', '""') + '"'
+
+def copy_session_rows(cursor, rows):
+    """Bulk load flattened session rows into PostgreSQL with COPY FROM STDIN"""
+    buf = io.StringIO()
+    buf.writelines(','.join(map(csv_field, row)) + '\n' for row in rows)
+    buf.seek(0)
+    cursor.copy_expert(COPY_SQL, buf)
+
+def insert_session_rows(cursor, rows):
+    """Insert a batch of flattened session rows using the fastest path for the backend"""
+    if DB_IS_SQLITE:
+        # executemany runs in a single transaction
+        cursor.executemany(INSERT_SQL, rows)
+    elif len(rows) > COPY_THRESHOLD:
+        # PostgreSQL: large batches stream through COPY
+        copy_session_rows(cursor, rows)
+    else:
+        # PostgreSQL: send rows as multi-row VALUES pages instead of one round-trip each
+        execute_values(cursor, BATCH_INSERT_SQL, rows, page_size=500)
+
+# Rows fetched per round-trip while streaming a download
+DOWNLOAD_FETCH_SIZE = 1000
+
+# A download keeps its connection until the client has read the whole body, so
+# cap concurrent downloads to leave the rest of the pool for other endpoints
+download_slots = threading.BoundedSemaphore(DB_POOL_MAX // 2)
+
+@contextmanager
+def download_slot():
+    """Hold one of the download_slots for the duration of a with block"""
+    if not download_slots.acquire(timeout=DB_POOL_TIMEOUT):
+        raise HTTPException(status_code=503, detail="Too many downloads in progress, please retry")
+    try:
+        yield
+    finally:
+        download_slots.release()
+
+def nest_record(row):
+    """Rebuild the uploaded nested structure from a flat row in RECORD_COLUMNS order"""
+    (session_id, phase, area, timestamp, speaker, text,
+     hmd_x, hmd_y, hmd_z, gaze_x, gaze_y, gaze_z, gaze_actor, hmd_speed,
+     r_x, r_y, r_z, l_x, l_y, l_z, r_actor, l_actor, r_speed, l_speed,
+     user_emotion, emotion_window_flag) = row
+    return {
+        "session_id": session_id,
+        "phase": phase,
+        "area": area,
+        "timestamp": timestamp,
+        "conversation_data": {
+            "speaker": speaker,
+            "text": text
+        },
+        "hmd_data": {
+            "position": {"x": hmd_x, "y": hmd_y, "z": hmd_z},
+            "gaze_vector": {"x": gaze_x, "y": gaze_y, "z": gaze_z},
+            "gaze_actor": gaze_actor,
+            "movement_speed": hmd_speed
+        },
+        "controller_data": {
+            "r_position": {"x": r_x, "y": r_y, "z": r_z},
+            "l_position": {"x": l_x, "y": l_y, "z": l_z},
+            "r_interacted_actor": r_actor,
+            "l_interacted_actor": l_actor,
+            "r_movement_speed": r_speed,
+            "l_movement_speed": l_speed
+        },
+        "user_emotion": user_emotion,
+        "emotion_window_flag": emotion_window_flag
+    }
+
+def stream_nested_session(resources, cursor, rows):
+    """Yield a session's records as a JSON array, one page of rows at a time"""
+    # resources holds the download slot and pooled connection; they are released
+    # once the body is sent or the generator is closed or garbage collected
+    with resources:
+        yield b'['
+        separator = b''
+        while rows:
+            yield separator + b','.join(
+                orjson.dumps(nest_record(row)) for row in rows
+            )
+            separator = b','
+            rows = cursor.fetchmany(DOWNLOAD_FETCH_SIZE)
+        yield b']'
 
-# Initialize database on startup
-init_db()
+def register_sessions(cursor, session_ids):
+    """Record newly uploaded session ids, ignoring ones already known"""
+    if DB_IS_SQLITE:
+        cursor.executemany(
+            'INSERT OR IGNORE INTO sessions (session_id) VALUES (?)',
+            [(session_id,) for session_id in session_ids]
+        )
+    else:
+        execute_values(
+            cursor,
+            'INSERT INTO sessions (session_id) VALUES %s ON CONFLICT (session_id) DO NOTHING',
+            [(session_id,) for session_id in session_ids]
+        )
+
+def ingest_session_file(fileobj, cursor):
+    """Stream records from an uploaded JSON array into the database, one batch at a time"""
+    records_added = 0
+    session_ids = set()
+    batch = []
+    for record in ijson.items(fileobj, 'item', use_float=True):
+        row = flatten_record(record)
+        session_ids.add(row[0])
+        batch.append(row)
+        if len(batch) >= UPLOAD_BATCH_SIZE:
+            insert_session_rows(cursor, batch)
+            records_added += len(batch)
+            batch = []
+    if batch:
+        insert_session_rows(cursor, batch)
+        records_added += len(batch)
+    register_sessions(cursor, session_ids)
+    return records_added
+
+# sessions.first_seen rendered as an ISO-8601 UTC string by the database
+FIRST_SEEN_ISO = (
+    "strftime('%Y-%m-%dT%H:%M:%SZ', s.first_seen)" if DB_IS_SQLITE
+    else "to_char(s.first_seen::timestamptz AT TIME ZONE 'UTC', 'YYYY-MM-DD\"T\"HH24:MI:SS\"Z\"')"
+)
 
 # Templates
 templates = Jinja2Templates(directory="templates")
@@ -141,119 +439,33 @@ async def home(request: Request):
     return templates.TemplateResponse("dashboard.html", {"request": request})
 
 @app.post("/upload")
-async def upload_session_data(file: UploadFile = File(...)):
+def upload_session_data(file: UploadFile = File(...)):
     """Upload session data JSON file"""
     if not file.filename.endswith('.json'):
         raise HTTPException(status_code=400, detail="Only JSON files are allowed")
     
     try:
-        content = await file.read()
-        data = json.loads(content.decode('utf-8'))
-        
-        if not isinstance(data, list):
+        # Reject anything but a top-level array before touching the database
+        file.file.seek(0)
+        _, first_event, _ = next(ijson.parse(file.file))
+        if first_event != 'start_array':
             raise HTTPException(status_code=400, detail="JSON must be an array of session records")
+        file.file.seek(0)
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Check if we're using SQLite or PostgreSQL
-        is_sqlite = hasattr(conn, 'execute') and 'sqlite' in str(type(conn)).lower()
-        
-        records_added = 0
-        for record in data:
-            if is_sqlite:
-                # SQLite uses ? placeholders
-                cursor.execute('''
-                    INSERT INTO session_records (
-                        session_id, phase, area, timestamp, speaker, text,
-                        hmd_position_x, hmd_position_y, hmd_position_z,
-                        hmd_gaze_x, hmd_gaze_y, hmd_gaze_z, hmd_gaze_actor, hmd_movement_speed,
-                        controller_r_x, controller_r_y, controller_r_z,
-                        controller_l_x, controller_l_y, controller_l_z,
-                        controller_r_actor, controller_l_actor,
-                        controller_r_speed, controller_l_speed,
-                        user_emotion, emotion_window_flag
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    record.get('session_id'),
-                    record.get('phase'),
-                    record.get('area'),
-                    record.get('timestamp'),
-                    record.get('conversation_data', {}).get('speaker'),
-                    record.get('conversation_data', {}).get('text'),
-                    record.get('hmd_data', {}).get('position', {}).get('x'),
-                    record.get('hmd_data', {}).get('position', {}).get('y'),
-                    record.get('hmd_data', {}).get('position', {}).get('z'),
-                    record.get('hmd_data', {}).get('gaze_vector', {}).get('x'),
-                    record.get('hmd_data', {}).get('gaze_vector', {}).get('y'),
-                    record.get('hmd_data', {}).get('gaze_vector', {}).get('z'),
-                    record.get('hmd_data', {}).get('gaze_actor'),
-                    record.get('hmd_data', {}).get('movement_speed'),
-                    record.get('controller_data', {}).get('r_position', {}).get('x'),
-                    record.get('controller_data', {}).get('r_position', {}).get('y'),
-                    record.get('controller_data', {}).get('r_position', {}).get('z'),
-                    record.get('controller_data', {}).get('l_position', {}).get('x'),
-                    record.get('controller_data', {}).get('l_position', {}).get('y'),
-                    record.get('controller_data', {}).get('l_position', {}).get('z'),
-                    record.get('controller_data', {}).get('r_interacted_actor'),
-                    record.get('controller_data', {}).get('l_interacted_actor'),
-                    record.get('controller_data', {}).get('r_movement_speed'),
-                    record.get('controller_data', {}).get('l_movement_speed'),
-                    record.get('user_emotion'),
-                    record.get('emotion_window_flag')
-                ))
-            else:
-                # PostgreSQL uses %s placeholders
-                cursor.execute('''
-                    INSERT INTO session_records (
-                        session_id, phase, area, timestamp, speaker, text,
-                        hmd_position_x, hmd_position_y, hmd_position_z,
-                        hmd_gaze_x, hmd_gaze_y, hmd_gaze_z, hmd_gaze_actor, hmd_movement_speed,
-                        controller_r_x, controller_r_y, controller_r_z,
-                        controller_l_x, controller_l_y, controller_l_z,
-                        controller_r_actor, controller_l_actor,
-                        controller_r_speed, controller_l_speed,
-                        user_emotion, emotion_window_flag
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                ''', (
-                    record.get('session_id'),
-                    record.get('phase'),
-                    record.get('area'),
-                    record.get('timestamp'),
-                    record.get('conversation_data', {}).get('speaker'),
-                    record.get('conversation_data', {}).get('text'),
-                    record.get('hmd_data', {}).get('position', {}).get('x'),
-                    record.get('hmd_data', {}).get('position', {}).get('y'),
-                    record.get('hmd_data', {}).get('position', {}).get('z'),
-                    record.get('hmd_data', {}).get('gaze_vector', {}).get('x'),
-                    record.get('hmd_data', {}).get('gaze_vector', {}).get('y'),
-                    record.get('hmd_data', {}).get('gaze_vector', {}).get('z'),
-                    record.get('hmd_data', {}).get('gaze_actor'),
-                    record.get('hmd_data', {}).get('movement_speed'),
-                    record.get('controller_data', {}).get('r_position', {}).get('x'),
-                    record.get('controller_data', {}).get('r_position', {}).get('y'),
-                    record.get('controller_data', {}).get('r_position', {}).get('z'),
-                    record.get('controller_data', {}).get('l_position', {}).get('x'),
-                    record.get('controller_data', {}).get('l_position', {}).get('y'),
-                    record.get('controller_data', {}).get('l_position', {}).get('z'),
-                    record.get('controller_data', {}).get('r_interacted_actor'),
-                    record.get('controller_data', {}).get('l_interacted_actor'),
-                    record.get('controller_data', {}).get('r_movement_speed'),
-                    record.get('controller_data', {}).get('l_movement_speed'),
-                    record.get('user_emotion'),
-                    record.get('emotion_window_flag')
-                ))
-            records_added += 1
-        
-        conn.commit()
-        conn.close()
-        
-        # Get updated session count
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT COUNT(DISTINCT session_id) FROM session_records')
-        total_sessions = cursor.fetchone()[0]
-        conn.close()
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            if not DB_IS_SQLITE:
+                # Don't wait for the WAL flush on commit; a lost upload can simply be retried
+                cursor.execute('SET LOCAL synchronous_commit = off')
+            
+            # Read straight from the spooled upload file; only one batch is held in memory
+            records_added = ingest_session_file(file.file, cursor)
+            
+            # Get updated session count from the same transaction
+            cursor.execute('SELECT COUNT(*) FROM sessions')
+            total_sessions = cursor.fetchone()[0]
+            
+            conn.commit()
         
         return {
             "message": f"Successfully uploaded {records_added} records", 
@@ -261,77 +473,37 @@ async def upload_session_data(file: UploadFile = File(...)):
             "total_sessions": total_sessions
         }
         
-    except json.JSONDecodeError:
+    except HTTPException:
+        raise
+    except ijson.JSONError:
         raise HTTPException(status_code=400, detail="Invalid JSON format")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing file: {str(e)}")
 
 @app.get("/api/sessions")
-async def get_sessions(limit: int = 100, offset: int = 0):
+def get_sessions(limit: int = 100, offset: int = 0):
     """Get list of all sessions with summary information"""
     try:
-        conn = get_db_connection()
-        
-        # Check if we're using SQLite or PostgreSQL
-        is_sqlite = hasattr(conn, 'execute') and 'sqlite' in str(type(conn)).lower()
-        
-        if is_sqlite:
+        with db_connection() as conn:
             cursor = conn.cursor()
-            # Get session summaries with count, timestamps, and emotion variety
-            cursor.execute('''
+            # Get session summaries with record counts and first upload time
+            cursor.execute(f'''
                 SELECT 
-                    session_id,
-                    COUNT(*) as records,
-                    MIN(created_at) as created
-                FROM session_records 
-                GROUP BY session_id
-                ORDER BY created DESC 
-                LIMIT ? OFFSET ?
+                    s.session_id,
+                    (SELECT COUNT(*) FROM session_records r WHERE r.session_id = s.session_id) as records,
+                    {FIRST_SEEN_ISO} as created
+                FROM sessions s
+                ORDER BY s.first_seen DESC 
+                LIMIT {PLACEHOLDER} OFFSET {PLACEHOLDER}
             ''', (limit, offset))
+            sessions = [
+                dict(zip(('session_id', 'records', 'created'), row))
+                for row in cursor.fetchall()
+            ]
             
-            columns = [description[0] for description in cursor.description]
-            rows = cursor.fetchall()
-            sessions = []
-            for row in rows:
-                session_dict = dict(zip(columns, row))
-                # Format timestamp to ISO format
-                if session_dict.get('created'):
-                    try:
-                        if isinstance(session_dict['created'], str):
-                            session_dict['created'] = session_dict['created'].replace(' ', 'T') + 'Z'
-                        else:
-                            session_dict['created'] = str(session_dict['created']).replace(' ', 'T') + 'Z'
-                    except Exception as e:
-                        print(f"Error formatting created: {e}")
-                        session_dict['created'] = str(session_dict['created'])
-                sessions.append(session_dict)
-                
             # Get total count of unique sessions
-            cursor.execute('SELECT COUNT(DISTINCT session_id) FROM session_records')
+            cursor.execute('SELECT COUNT(*) FROM sessions')
             total_sessions = cursor.fetchone()[0]
-            
-        else:
-            cursor = conn.cursor(cursor_factory=RealDictCursor)
-            # Get session summaries with count, timestamps, and emotion variety
-            cursor.execute('''
-                SELECT 
-                    session_id,
-                    COUNT(*) as records,
-                    MIN(created_at) as created
-                FROM session_records 
-                GROUP BY session_id
-                ORDER BY created DESC 
-                LIMIT %s OFFSET %s
-            ''', (limit, offset))
-            
-            rows = cursor.fetchall()
-            sessions = [dict(row) for row in rows]
-            
-            # Get total count of unique sessions
-            cursor.execute('SELECT COUNT(DISTINCT session_id) FROM session_records')
-            total_sessions = cursor.fetchone()['count']
-        
-        conn.close()
         
         # Debug logging
         print(f"Sessions endpoint: Found {len(sessions)} sessions, total: {total_sessions}")
@@ -350,6 +522,9 @@ async def get_sessions(limit: int = 100, offset: int = 0):
             "total": total_sessions,
             "has_more": len(sessions) == limit
         }
+    except HTTPException:
+        # Pool exhaustion surfaces as 503 rather than a degraded payload
+        raise
     except Exception as e:
         # Log the error for debugging
         print(f"Error in sessions endpoint: {str(e)}")
@@ -364,154 +539,77 @@ async def get_sessions(limit: int = 100, offset: int = 0):
         }
 
 @app.get("/api/sessions/{session_id}")
-async def get_session_by_id(session_id: str):
+def get_session_by_id(session_id: str):
     """Get all records for a specific session"""
-    conn = get_db_connection()
-    
-    # Check if we're using SQLite or PostgreSQL
-    is_sqlite = hasattr(conn, 'execute') and 'sqlite' in str(type(conn)).lower()
-    
-    if is_sqlite:
+    with db_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute('''
-            SELECT * FROM session_records 
-            WHERE session_id = ? 
+        cursor.execute(f'''
+            SELECT {SESSION_RECORD_SELECT} FROM session_records 
+            WHERE session_id = {PLACEHOLDER} 
             ORDER BY timestamp
         ''', (session_id,))
         
-        columns = [description[0] for description in cursor.description]
-        rows = cursor.fetchall()
-        sessions = []
-        for row in rows:
-            session_dict = dict(zip(columns, row))
-            sessions.append(session_dict)
-    else:
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
-        cursor.execute('''
-            SELECT * FROM session_records 
-            WHERE session_id = %s 
-            ORDER BY timestamp
-        ''', (session_id,))
+        sessions = [dict(zip(SESSION_RECORD_COLUMNS, row)) for row in cursor.fetchall()]
         
-        rows = cursor.fetchall()
-        sessions = [dict(row) for row in rows]
-    
-    conn.close()
     return {"session_id": session_id, "records": sessions}
 
 @app.get("/api/sessions/{session_id}/download")
-async def download_session_with_nested_structure(session_id: str):
+def download_session_with_nested_structure(session_id: str):
     """Download session data with original nested structure preserved"""
-    conn = get_db_connection()
-    
-    # Check if we're using SQLite or PostgreSQL
-    is_sqlite = hasattr(conn, 'execute') and 'sqlite' in str(type(conn)).lower()
-    
-    if is_sqlite:
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT * FROM session_records 
-            WHERE session_id = ? 
-            ORDER BY timestamp
-        ''', (session_id,))
-        
-        columns = [description[0] for description in cursor.description]
-        rows = cursor.fetchall()
-        flat_records = []
-        for row in rows:
-            record_dict = dict(zip(columns, row))
-            flat_records.append(record_dict)
-    else:
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
-        cursor.execute('''
-            SELECT * FROM session_records 
-            WHERE session_id = %s 
+    resources = ExitStack()
+    try:
+        resources.enter_context(download_slot())
+        conn = resources.enter_context(db_connection())
+        # On PostgreSQL a named cursor keeps the result set server-side and pages through it
+        cursor = conn.cursor() if DB_IS_SQLITE else conn.cursor(name='session_download')
+        cursor.execute(f'''
+            SELECT {RECORD_SELECT} FROM session_records 
+            WHERE session_id = {PLACEHOLDER} 
             ORDER BY timestamp
         ''', (session_id,))
-        
-        rows = cursor.fetchall()
-        flat_records = [dict(row) for row in rows]
-    
-    conn.close()
-    
-    # Reconstruct nested structure
-    nested_records = []
-    for record in flat_records:
-        nested_record = {
-            "session_id": record.get("session_id"),
-            "phase": record.get("phase"),
-            "area": record.get("area"),
-            "timestamp": record.get("timestamp"),
-            "conversation_data": {
-                "speaker": record.get("speaker"),
-                "text": record.get("text")
-            },
-            "hmd_data": {
-                "position": {
-                    "x": record.get("hmd_position_x"),
-                    "y": record.get("hmd_position_y"),
-                    "z": record.get("hmd_position_z")
-                },
-                "gaze_vector": {
-                    "x": record.get("hmd_gaze_x"),
-                    "y": record.get("hmd_gaze_y"),
-                    "z": record.get("hmd_gaze_z")
-                },
-                "gaze_actor": record.get("hmd_gaze_actor"),
-                "movement_speed": record.get("hmd_movement_speed")
-            },
-            "controller_data": {
-                "r_position": {
-                    "x": record.get("controller_r_x"),
-                    "y": record.get("controller_r_y"),
-                    "z": record.get("controller_r_z")
-                },
-                "l_position": {
-                    "x": record.get("controller_l_x"),
-                    "y": record.get("controller_l_y"),
-                    "z": record.get("controller_l_z")
-                },
-                "r_interacted_actor": record.get("controller_r_actor"),
-                "l_interacted_actor": record.get("controller_l_actor"),
-                "r_movement_speed": record.get("controller_r_speed"),
-                "l_movement_speed": record.get("controller_l_speed")
-            },
-            "user_emotion": record.get("user_emotion"),
-            "emotion_window_flag": record.get("emotion_window_flag")
-        }
-        nested_records.append(nested_record)
+        # Fetch the first page before responding so query errors still get an error status
+        rows = cursor.fetchmany(DOWNLOAD_FETCH_SIZE)
+    except BaseException:
+        resources.close()
+        raise
     
-    return JSONResponse(
-        content=nested_records,
+    body = stream_nested_session(resources, cursor, rows)
+    # Run the generator into its with block so it owns resources from here on;
+    # a response dropped before streaming then still releases them
+    opening = next(body)
+    return StreamingResponse(
+        itertools.chain((opening,), body),
+        media_type="application/json",
         headers={"Content-Disposition": f"attachment; filename=session_{session_id}.json"}
     )
 
 @app.get("/api/health")
-async def health_check():
-    """Health check endpoint to test database connection"""
+def health_check(deep: bool = False):
+    """Health check endpoint to test database connection; pass deep=1 for row counts"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Test basic query
-        cursor.execute('SELECT 1')
-        cursor.fetchone()
-        
-        # Check if table exists and has data
-        cursor.execute('SELECT COUNT(*) FROM session_records')
-        total_records = cursor.fetchone()[0]
-        
-        cursor.execute('SELECT COUNT(DISTINCT session_id) FROM session_records')
-        total_sessions = cursor.fetchone()[0]
-        
-        conn.close()
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            
+            # Test basic query
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+            
+            health = {
+                "status": "healthy",
+                "database": "connected"
+            }
+            if deep:
+                # Check if table exists and has data
+                cursor.execute('SELECT COUNT(*) FROM session_records')
+                health["total_records"] = cursor.fetchone()[0]
+                
+                cursor.execute('SELECT COUNT(*) FROM sessions')
+                health["total_sessions"] = cursor.fetchone()[0]
         
-        return {
-            "status": "healthy",
-            "database": "connected",
-            "total_records": total_records,
-            "total_sessions": total_sessions
-        }
+        return health
+    except HTTPException:
+        # Pool exhaustion surfaces as 503 rather than a degraded payload
+        raise
     except Exception as e:
         return {
             "status": "unhealthy",
@@ -520,47 +618,42 @@ async def health_check():
         }
 
 @app.get("/api/stats")
-async def get_stats():
+def get_stats():
     """Get basic statistics about the data"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Check if we're using SQLite or PostgreSQL
-    is_sqlite = hasattr(conn, 'execute') and 'sqlite' in str(type(conn)).lower()
-    
-    # Total records
-    cursor.execute('SELECT COUNT(*) FROM session_records')
-    total_records = cursor.fetchone()[0]
-    
-    # Unique sessions
-    cursor.execute('SELECT COUNT(DISTINCT session_id) FROM session_records')
-    unique_sessions = cursor.fetchone()[0]
-    
-    # Recent activity (last 24 hours)
-    if is_sqlite:
-        cursor.execute('''
-            SELECT COUNT(*) FROM session_records 
-            WHERE created_at >= datetime('now', '-1 day')
-        ''')
-    else:
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        
+        # Total records
+        cursor.execute('SELECT COUNT(*) FROM session_records')
+        total_records = cursor.fetchone()[0]
+        
+        # Unique sessions
+        cursor.execute('SELECT COUNT(*) FROM sessions')
+        unique_sessions = cursor.fetchone()[0]
+        
+        # Recent activity (last 24 hours)
+        if DB_IS_SQLITE:
+            cursor.execute('''
+                SELECT COUNT(*) FROM session_records 
+                WHERE created_at >= datetime('now', '-1 day')
+            ''')
+        else:
+            cursor.execute('''
+                SELECT COUNT(*) FROM session_records 
+                WHERE created_at >= NOW() - INTERVAL '1 day'
+            ''')
+        recent_records = cursor.fetchone()[0]
+        
+        # Most common emotions
         cursor.execute('''
-            SELECT COUNT(*) FROM session_records 
-            WHERE created_at >= NOW() - INTERVAL '1 day'
+            SELECT user_emotion, COUNT(*) as count 
+            FROM session_records 
+            WHERE user_emotion IS NOT NULL AND user_emotion != ''
+            GROUP BY user_emotion 
+            ORDER BY count DESC 
+            LIMIT 5
         ''')
-    recent_records = cursor.fetchone()[0]
-    
-    # Most common emotions
-    cursor.execute('''
-        SELECT user_emotion, COUNT(*) as count 
-        FROM session_records 
-        WHERE user_emotion IS NOT NULL AND user_emotion != ''
-        GROUP BY user_emotion 
-        ORDER BY count DESC 
-        LIMIT 5
-    ''')
-    top_emotions = cursor.fetchall()
-    
-    conn.close()
+        top_emotions = cursor.fetchall()
     
     return {
         "total_records": total_records,
@@ -570,13 +663,13 @@ async def get_stats():
     }
 
 @app.delete("/api/clear")
-async def clear_data():
+def clear_data():
     """Clear all data from the database"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('DELETE FROM session_records')
-    conn.commit()
-    conn.close()
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM session_records')
+        cursor.execute('DELETE FROM sessions')
+        conn.commit()
     return {"message": "All data cleared"}
 
 if __name__ == "__main__":
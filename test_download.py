@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Check that download responses give back their database resources
+"""
+
+import gc
+import os
+import sys
+import tempfile
+
+# Run against a throwaway SQLite database instead of a live server
+os.environ.setdefault("USE_SQLITE", "1")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.chdir(tempfile.mkdtemp())
+
+import main
+
+def test_unread_download_releases_resources():
+    """Dropping a download response without streaming it frees its slot and connection"""
+    print("Testing unread download responses...")
+
+    # More responses than download slots, so a leak would end in a 503
+    for _ in range(main.DB_POOL_MAX):
+        response = main.download_session_with_nested_structure("test-session-123")
+        del response
+    gc.collect()
+
+    assert main.download_slots._value == main.DB_POOL_MAX // 2
+    assert main.db_pool_slots._value == main.DB_POOL_MAX
+    print("✅ Download slots and connections released")
+
+if __name__ == "__main__":
+    test_unread_download_releases_resources()
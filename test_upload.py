@@ -4,7 +4,7 @@ Test script for the VR Session Data Server
 """
 
 import requests
-import json
+import orjson
 import time
 from datetime import datetime
 
@@ -76,8 +76,8 @@ def test_upload():
     test_data = create_test_data()
     
     # Save to temporary file
-    with open("test_session_data.json", "w") as f:
-        json.dump(test_data, f, indent=2)
+    with open("test_session_data.json", "wb") as f:
+        f.write(orjson.dumps(test_data, option=orjson.OPT_INDENT_2))
     
     # Upload file
     with open("test_session_data.json", "rb") as f:
@@ -85,7 +85,7 @@ def test_upload():
         response = requests.post(f"{SERVER_URL}/upload", files=files)
     
     if response.status_code == 200:
-        result = response.json()
+        result = orjson.loads(response.content)
         print(f"✅ Upload successful: {result['records_added']} records added")
         return True
     else:
@@ -99,7 +99,7 @@ def test_stats():
     response = requests.get(f"{SERVER_URL}/api/stats")
     
     if response.status_code == 200:
-        stats = response.json()
+        stats = orjson.loads(response.content)
         print("✅ Statistics retrieved:")
         print(f"   Total records: {stats['total_records']}")
         print(f"   Unique sessions: {stats['unique_sessions']}")
@@ -117,7 +117,7 @@ def test_sessions():
     response = requests.get(f"{SERVER_URL}/api/sessions?limit=10")
     
     if response.status_code == 200:
-        data = response.json()
+        data = orjson.loads(response.content)
         print(f"✅ Sessions retrieved: {len(data['sessions'])} records")
         if data['sessions']:
             session = data['sessions'][0]